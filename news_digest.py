@@ -2,17 +2,28 @@
 import os
 import json
 import time
+import asyncio
+import hashlib
+import heapq
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import ujson
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
+import aiohttp
 import feedparser
-from jinja2 import Environment, FileSystemLoader
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Table, MetaData
+from lxml import etree
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from sqlalchemy import create_engine, event, exists, inspect, select, Column, String, Text, DateTime, Index, Table, MetaData
 from sqlalchemy.exc import OperationalError
+import ciso8601
 import dateparser
 from dateutil import tz
-import openai
+from openai import AsyncOpenAI, APIConnectionError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
 
@@ -28,45 +39,191 @@ FROM_EMAIL = os.getenv("FROM_EMAIL")
 TO_EMAIL = os.getenv("TO_EMAIL")
 MAX_STORIES = int(os.getenv("MAX_STORIES", "15"))
 TIMEZONE = os.getenv("TIMEZONE", "UTC")
+LOCAL_TZ = tz.gettz(TIMEZONE)
+# Unset: Jinja's per-user directory under the system temp dir
+JINJA_CACHE_DIR = os.getenv("JINJA_CACHE_DIR")
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "10"))
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "8"))
+# The JSON result is ~60 tokens; a tight cap keeps latency and cost down
+LLM_MAX_TOKENS = 120
+LLM_CACHE_TTL_DAYS = int(os.getenv("LLM_CACHE_TTL_DAYS", "7"))
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "90000"))
+USE_BATCH_API = os.getenv("USE_BATCH_API") == "1"
+BATCH_POLL_INTERVAL = int(os.getenv("BATCH_POLL_INTERVAL", "30"))
+BATCH_MAX_WAIT = int(os.getenv("BATCH_MAX_WAIT", str(5 * 3600)))
 
 # DB cache (SQLite)
 DB_FILE = os.getenv("CACHE_DB", "seen_articles.db")
 engine = create_engine(f"sqlite:///{DB_FILE}", echo=False)
 meta = MetaData()
 
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_conn, conn_record):
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.execute("PRAGMA cache_size=-64000")
+    cur.execute("PRAGMA mmap_size=30000000000")
+    cur.close()
+
+# article_id is the key itself, so no surrogate id / rowid; seen_at is indexed for pruning
 articles_table = Table(
     'seen_articles', meta,
-    Column('id', Integer, primary_key=True, autoincrement=True),
-    Column('article_id', String, unique=True, nullable=False),
-    Column('seen_at', DateTime, nullable=False)
+    Column('article_id', String, primary_key=True),
+    Column('seen_at', DateTime, nullable=False),
+    Index('idx_seen_at', 'seen_at'),
+    sqlite_with_rowid=False
+)
+
+# LLM responses keyed by a hash of title + url, so identical articles are only summarized once
+llm_cache_table = Table(
+    'llm_cache', meta,
+    Column('content_hash', String, primary_key=True),
+    Column('response_json', Text, nullable=False),
+    Column('created_at', DateTime, nullable=False),
+    sqlite_with_rowid=False
 )
 
+def migrate_schema(bind):
+    # One-time upgrades of tables written by older versions; create_all skips existing tables
+    inspector = inspect(bind)
+    # seen_articles: old layout had a surrogate id + UNIQUE article_id; copy rows into the new layout
+    if inspector.has_table('seen_articles') and 'id' in {c['name'] for c in inspector.get_columns('seen_articles')}:
+        with bind.begin() as conn:
+            conn.exec_driver_sql("ALTER TABLE seen_articles RENAME TO seen_articles_old")
+            articles_table.create(conn)
+            conn.exec_driver_sql("INSERT OR IGNORE INTO seen_articles (article_id, seen_at) "
+                                 "SELECT article_id, seen_at FROM seen_articles_old")
+            conn.exec_driver_sql("DROP TABLE seen_articles_old")
+    # llm_cache is disposable: rebuild it if an older layout without created_at is on disk
+    if inspector.has_table('llm_cache') and 'created_at' not in {c['name'] for c in inspector.get_columns('llm_cache')}:
+        llm_cache_table.drop(bind)
+
+migrate_schema(engine)
 meta.create_all(engine)
 
-# Setup OpenAI
-openai.api_key = OPENAI_API_KEY
+# Setup OpenAI (created lazily so a missing key only fails the LLM calls)
+_openai_client = None
+
+def get_openai_client():
+    global _openai_client
+    if _openai_client is None:
+        if not OPENAI_API_KEY:
+            raise RuntimeError("OpenAI API key not configured.")
+        # SDK retries off: the rate limiter + tenacity in create_chat_completion are the only retry policy
+        _openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+    return _openai_client
+
+class RateLimiter:
+    # Local token buckets for requests/min and tokens/min, so bursts wait here instead of hitting 429s
+    def __init__(self, rpm, tpm):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.available_requests = float(rpm)
+        self.available_tokens = float(tpm)
+        self.last_update = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.last_update
+        self.available_requests = min(self.rpm, self.available_requests + elapsed * self.rpm / 60.0)
+        self.available_tokens = min(self.tpm, self.available_tokens + elapsed * self.tpm / 60.0)
+        self.last_update = now
+
+    async def acquire(self, est_tokens):
+        est_tokens = min(est_tokens, self.tpm)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.available_requests >= 1 and self.available_tokens >= est_tokens:
+                    self.available_requests -= 1
+                    self.available_tokens -= est_tokens
+                    return
+                wait = max((1 - self.available_requests) * 60.0 / self.rpm,
+                           (est_tokens - self.available_tokens) * 60.0 / self.tpm)
+                await asyncio.sleep(wait)
+
+    def release(self, est_tokens, actual_tokens):
+        # Give back whatever the estimate over-reserved
+        self._refill()
+        self.available_tokens = min(self.tpm, self.available_tokens + est_tokens - actual_tokens)
+
+limiter = RateLimiter(rpm=OPENAI_RPM, tpm=OPENAI_TPM)
+
+@retry(retry=retry_if_exception_type(APIConnectionError), wait=wait_random_exponential(min=1, max=30),
+       stop=stop_after_attempt(5), reraise=True)
+async def create_chat_completion(request):
+    # Rough estimate: ~4 chars per prompt token plus the full completion budget
+    prompt_chars = sum(len(m["content"]) for m in request["messages"])
+    est_tokens = prompt_chars // 4 + request["max_tokens"]
+    await limiter.acquire(est_tokens)
+    resp = await get_openai_client().chat.completions.create(**request)
+    if resp.usage is not None:
+        limiter.release(est_tokens, resp.usage.total_tokens)
+    return resp
 
-# Jinja env
-env = Environment(loader=FileSystemLoader('.'), autoescape=True)
+# Shared HTTP session so connections (TCP + TLS) are reused; pool sized for the RSS thread pool
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(pool_connections=20, pool_maxsize=20))
+SESSION.mount('http://', HTTPAdapter(pool_connections=20, pool_maxsize=20))
+
+# Jinja env: compiled templates are kept in an on-disk bytecode cache, which is keyed on the
+# template source checksum, so edits to the template are picked up automatically
+if JINJA_CACHE_DIR:
+    os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+env = Environment(loader=FileSystemLoader('.'), autoescape=True, bytecode_cache=FileSystemBytecodeCache(directory=JINJA_CACHE_DIR))
 template = env.get_template('email_template.html')
 
+def article_key(article):
+    return article.get('id') or article.get('url') or article.get('title')
+
+# In-process view of seen_articles (article_id -> seen?), filled lazily from the DB
+_seen_cache = {}
+_pending_seen = []
+
+# DB helpers take the caller's connection, so a whole run shares one connection
+def fetch_seen(conn, article_ids):
+    # One IN (...) query for the whole list instead of a round-trip per article
+    if not article_ids:
+        return set()
+    sel = select(articles_table.c.article_id).where(articles_table.c.article_id.in_(article_ids))
+    return {row[0] for row in conn.execute(sel)}
+
+def prefetch_seen(conn, article_ids):
+    misses = list(dict.fromkeys(x for x in article_ids if x and x not in _seen_cache))
+    if not misses:
+        return
+    found = fetch_seen(conn, misses)
+    for x in misses:
+        _seen_cache[x] = x in found
+
+def is_seen(conn, article_id):
+    if article_id not in _seen_cache:
+        sel = select(exists().where(articles_table.c.article_id == article_id))
+        _seen_cache[article_id] = bool(conn.execute(sel).scalar())
+    return _seen_cache[article_id]
+
 def add_seen(article_id):
-    ins = articles_table.insert().values(article_id=article_id, seen_at=datetime.utcnow())
-    conn = engine.connect()
-    try:
-        conn.execute(ins)
-    except Exception:
-        pass
-    conn.close()
-
-def is_seen(article_id):
-    sel = articles_table.select().where(articles_table.c.article_id == article_id)
-    conn = engine.connect()
-    res = conn.execute(sel).fetchone()
-    conn.close()
-    return res is not None
-
-def fetch_newsapi(q='(business OR technology) AND (startup OR ai OR product OR market)', page_size=50):
+    # Recorded in memory; written to the DB by flush_seen()
+    if not article_id or _seen_cache.get(article_id):
+        return
+    _seen_cache[article_id] = True
+    _pending_seen.append(article_id)
+
+def flush_seen(conn):
+    # Single multi-row insert; ids already in the table are skipped
+    if not _pending_seen:
+        return
+    now = datetime.utcnow()
+    rows = [{"article_id": x, "seen_at": now} for x in _pending_seen]
+    conn.execute(articles_table.insert().prefix_with("OR IGNORE"), rows)
+    conn.commit()
+    _pending_seen.clear()
+
+async def fetch_newsapi(q='(business OR technology) AND (startup OR ai OR product OR market)', page_size=50):
     if not NEWSAPI_KEY:
         return []
     url = "https://newsapi.org/v2/everything"
@@ -77,8 +234,9 @@ def fetch_newsapi(q='(business OR technology) AND (startup OR ai OR product OR m
         "sortBy": "publishedAt",
         "apiKey": NEWSAPI_KEY
     }
-    r = requests.get(url, params=params, timeout=20)
-    data = r.json()
+    async with aiohttp.ClientSession(trust_env=True) as session:
+        async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=20)) as r:
+            data = await r.json(loads=ujson.loads, content_type=None)
     articles = []
     if data.get('status') == 'ok':
         for a in data.get('articles', []):
@@ -89,48 +247,132 @@ def fetch_newsapi(q='(business OR technology) AND (startup OR ai OR product OR m
                 "title": a.get('title'),
                 "url": a.get('url'),
                 "source": a.get('source', {}).get('name'),
-                "published": published,
-                "raw": a
+                "published": published
             })
     return articles
 
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+DC_NS = "{http://purl.org/dc/elements/1.1/}"
+
+def _findtext(el, path):
+    text = el.findtext(path)
+    return text.strip() if text and text.strip() else None
+
+def parse_feed_xml(content, feed):
+    # Plain RSS 2.0 / Atom only need a few fields, so read them straight off the XML tree
+    parser = etree.XMLParser(resolve_entities=False, no_network=True)
+    root = etree.fromstring(content, parser)
+    results = []
+    items = root.findall('.//item')
+    if items:
+        source = _findtext(root, 'channel/title') or feed
+        for item in items:
+            title = _findtext(item, 'title')
+            guid = _findtext(item, 'guid')
+            link = _findtext(item, 'link')
+            # Like feedparser: a permalink guid stands in for a missing <link>
+            if not link and guid and item.find('guid').get('isPermaLink', 'true').lower() != 'false':
+                link = guid
+            pub = _findtext(item, 'pubDate') or _findtext(item, DC_NS + 'date') or ''
+            results.append({
+                "id": link or guid or ((title or '') + pub),
+                "title": title,
+                "url": link,
+                "source": source,
+                "published": pub
+            })
+        return results
+    entries = root.findall(ATOM_NS + 'entry')
+    if not entries:
+        raise ValueError(f"No RSS items or Atom entries in {feed}")
+    source = _findtext(root, ATOM_NS + 'title') or feed
+    for entry in entries:
+        title = _findtext(entry, ATOM_NS + 'title')
+        link = next((l.get('href') for l in entry.findall(ATOM_NS + 'link')
+                     if l.get('rel', 'alternate') == 'alternate'), None)
+        pub = _findtext(entry, ATOM_NS + 'published') or _findtext(entry, ATOM_NS + 'updated') or ''
+        results.append({
+            "id": link or _findtext(entry, ATOM_NS + 'id') or ((title or '') + pub),
+            "title": title,
+            "url": link,
+            "source": source,
+            "published": pub
+        })
+    return results
+
+def parse_feed_with_feedparser(content, feed):
+    parsed = feedparser.parse(content)
+    results = []
+    for e in parsed.entries:
+        art_id = e.get('link') or e.get('id') or (e.get('title') + e.get('published', ''))
+        pub = e.get('published') or e.get('updated') or ''
+        results.append({
+            "id": art_id,
+            "title": e.get('title'),
+            "url": e.get('link'),
+            "source": parsed.feed.get('title') or feed,
+            "published": pub
+        })
+    return results
+
+def parse_feed(feed):
+    r = SESSION.get(feed, timeout=20)
+    r.raise_for_status()
+    try:
+        return parse_feed_xml(r.content, feed)
+    except (etree.XMLSyntaxError, ValueError):
+        # Malformed or exotic feeds (RSS 1.0, broken XML, ...): feedparser is slower but forgiving
+        return parse_feed_with_feedparser(r.content, feed)
+
 def fetch_rss_feeds():
     feeds = [f.strip() for f in RSS_FEEDS.split(',') if f.strip()]
+    if not feeds:
+        return []
     results = []
-    for feed in feeds:
-        try:
-            parsed = feedparser.parse(feed)
-            for e in parsed.entries:
-                art_id = e.get('link') or e.get('id') or (e.get('title') + e.get('published', ''))
-                pub = e.get('published') or e.get('updated') or ''
-                results.append({
-                    "id": art_id,
-                    "title": e.get('title'),
-                    "url": e.get('link'),
-                    "source": parsed.feed.get('title') or feed,
-                    "published": pub,
-                    "raw": e
-                })
-        except Exception:
-            continue
+    # Feeds are fetched concurrently; a failing feed is skipped without affecting the others
+    with ThreadPoolExecutor(max_workers=min(16, len(feeds))) as pool:
+        futures = [pool.submit(parse_feed, feed) for feed in feeds]
+        for fut in as_completed(futures):
+            try:
+                results.extend(fut.result())
+            except Exception:
+                continue
     return results
 
-def normalize_date(d):
+def parse_date(d):
     if not d:
         return None
-    dt = dateparser.parse(d)
+    # Fast C/stdlib paths for ISO-8601 (NewsAPI) and RFC 822 (RSS); dateparser for anything else
+    try:
+        return ciso8601.parse_datetime(d)
+    except ValueError:
+        try:
+            return parsedate_to_datetime(d)
+        except (TypeError, ValueError):
+            return dateparser.parse(d)
+
+def published_sort_key(article):
+    # Compare real instants: NewsAPI (ISO) and RSS (RFC 822) date strings don't sort against each other
+    dt = parse_date(article.get('published'))
+    if not dt:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+def normalize_date(d):
+    dt = parse_date(d)
     if not dt:
         return None
     # convert to timezone name
-    return dt.astimezone(tz.gettz(TIMEZONE)).strftime("%Y-%m-%d %H:%M %Z")
+    return dt.astimezone(LOCAL_TZ).strftime("%Y-%m-%d %H:%M %Z")
 
-def dedupe_and_filter(articles):
+def dedupe_and_filter(conn, articles):
+    keys = [article_key(a) for a in articles]
+    prefetch_seen(conn, keys)
     unique = {}
-    for a in articles:
-        key = a.get('id') or a.get('url') or a.get('title')
+    for a, key in zip(articles, keys):
         if not key:
             continue
-        if is_seen(key):
+        if is_seen(conn, key):
             continue
         if key in unique:
             continue
@@ -148,39 +390,219 @@ produce:
 Return JSON: {{ "summary": "...", "tags": ["AI"], "sentiment": "Neutral", "score": 0.83 }}
 """
 
-def call_llm_for_article(article):
+# Same task for several articles at once; inputs are numbered [0], [1], ...
+BATCH_SUMMARIZE_PROMPT = """
+You are a concise news summarizer. Given a numbered list of articles (title and url each),
+produce for every article:
+- a 1-2 sentence factual summary (no opinion)
+- topic tags (choose from: AI, Markets, Startups, Product, Regulation, M&A, Hiring, Research, Other)
+- a short sentiment label (Positive, Neutral, Negative)
+- a relevance score 0-1 (as a float)
+Return a JSON array with one object per input, keyed by index, wrapped in an object.
+Every object MUST include "index": the 0-based number shown in brackets before its input.
+{{ "results": [ {{ "index": 0, "summary": "...", "tags": ["AI"], "sentiment": "Neutral", "score": 0.83 }} ] }}
+"""
+
+def build_article_request(article):
     # Build context (title + url + excerpt)
     text = f"Title: {article.get('title')}\nURL: {article.get('url')}\n\nIf you can fetch the article, summarize; if not, summarize from the title and short snippet.\n\n"
+    content = f"{text}"
+    return {
+        "model": OPENAI_MODEL,
+        "messages": [{"role":"system","content":"You are a precise news summarizer. Respond ONLY with JSON, max 60 tokens."},
+                     {"role":"user","content": SUMMARIZE_PROMPT + "\n\n" + content}],
+        "max_tokens": LLM_MAX_TOKENS,
+        "temperature": 0.0,
+        "response_format": {"type": "json_object"}
+    }
+
+async def call_llm_for_article(article):
+    resp = await create_chat_completion(build_article_request(article))
+    out = resp.choices[0].message.content.strip()
+    return ujson.loads(out)
+
+async def call_llm_for_batch(articles):
+    # One request for the whole batch; returns one result per article, None where the model skipped one
+    content = "\n".join(f"[{i}] Title: {a.get('title')}\nURL: {a.get('url')}" for i, a in enumerate(articles))
+    resp = await create_chat_completion({
+        "model": OPENAI_MODEL,
+        "messages": [{"role":"system","content":"You are a precise news summarizer. Respond ONLY with JSON, max 60 tokens per article."},
+                     {"role":"user","content": BATCH_SUMMARIZE_PROMPT + "\n\n" + content}],
+        "max_tokens": LLM_MAX_TOKENS * len(articles),
+        "temperature": 0.0,
+        "response_format": {"type": "json_object"}
+    })
+    out = resp.choices[0].message.content.strip()
+    return map_batch_results(ujson.loads(out)["results"], len(articles))
+
+def map_batch_results(results, n):
+    # Map batch results back to input positions. Anything ambiguous (1-based numbering, missing
+    # items, duplicates) returns all None so the caller re-requests each article on its own,
+    # rather than risk caching a summary against the wrong article.
+    if not isinstance(results, list) or not all(isinstance(r, dict) for r in results):
+        return [None] * n
     try:
-        content = f"{text}"
-        resp = openai.ChatCompletion.create(
-            model=OPENAI_MODEL,
-            messages=[{"role":"system","content":"You are a precise news summarizer."},
-                      {"role":"user","content": SUMMARIZE_PROMPT + "\n\n" + content}],
-            max_tokens=400,
-            temperature=0.0
-        )
-        out = resp['choices'][0]['message']['content'].strip()
-        # Expect JSON in output — try to parse; otherwise fallback to simple text parse
+        indices = [int(r["index"]) for r in results]
+    except (KeyError, TypeError, ValueError):
+        indices = None
+    if indices is not None and sorted(indices) == list(range(n)):
+        by_index = dict(zip(indices, results))
+        return [by_index[i] for i in range(n)]
+    # Otherwise trust the order only when there is exactly one result per input
+    if len(results) == n:
+        return list(results)
+    return [None] * n
+
+def chunked(items, size):
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+def fallback_llm_result(article):
+    return {
+        "summary": article.get('title') or "",
+        "tags": ["Other"],
+        "sentiment": "Neutral",
+        "score": 0.5
+    }
+
+async def summarize_articles(articles):
+    # Batches of LLM_BATCH_SIZE articles per request, at most LLM_CONCURRENCY requests in flight;
+    # results keep input order
+    sem = asyncio.Semaphore(LLM_CONCURRENCY)
+
+    async def sem_call(fn, arg):
+        async with sem:
+            return await fn(arg)
+
+    async def summarize_batch(batch):
         try:
-            parsed = json.loads(out)
-            return parsed
+            results = await sem_call(call_llm_for_batch, batch)
         except Exception:
-            # fallback: create a simple summary
-            return {
-                "summary": out[:400],
-                "tags": ["Other"],
-                "sentiment": "Neutral",
-                "score": 0.5
-            }
-    except Exception as e:
-        # Fail gracefully
-        return {
-            "summary": article.get('title') or "",
-            "tags": ["Other"],
-            "sentiment": "Neutral",
-            "score": 0.5
-        }
+            results = [None] * len(batch)
+        # Per-article fallback for anything the batch call did not return
+        missing = [i for i, r in enumerate(results) if r is None]
+        retried = await asyncio.gather(*[sem_call(call_llm_for_article, batch[i]) for i in missing], return_exceptions=True)
+        for i, r in zip(missing, retried):
+            results[i] = r
+        return results
+
+    batch_results = await asyncio.gather(*[summarize_batch(b) for b in chunked(articles, LLM_BATCH_SIZE)])
+    results = [r for batch in batch_results for r in batch]
+    # None marks a failed article
+    return [None if isinstance(r, Exception) else r for r in results]
+
+async def summarize_articles_via_batch_api(articles):
+    # OpenAI Batch API: half the token price and no RPM pressure, but results take minutes,
+    # which is fine for the scheduled digest
+    client = get_openai_client()
+    lines = [json.dumps({
+        "custom_id": str(i),
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": build_article_request(a)
+    }) for i, a in enumerate(articles)]
+    batch_file = await client.files.create(file=("requests.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch")
+    batch = await client.batches.create(input_file_id=batch_file.id, endpoint="/v1/chat/completions", completion_window="24h")
+
+    deadline = time.monotonic() + BATCH_MAX_WAIT
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        if time.monotonic() > deadline:
+            await client.batches.cancel(batch.id)
+            raise TimeoutError(f"Batch {batch.id} still {batch.status} after {BATCH_MAX_WAIT}s")
+        await asyncio.sleep(BATCH_POLL_INTERVAL)
+        batch = await client.batches.retrieve(batch.id)
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} ended as {batch.status}")
+
+    results = [None] * len(articles)
+    if batch.output_file_id:
+        output = await client.files.content(batch.output_file_id)
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            # A bad line only loses that article, not the rest of the paid batch
+            try:
+                row = ujson.loads(line)
+                resp = row.get("response") or {}
+                if resp.get("status_code") != 200:
+                    continue
+                out = resp["body"]["choices"][0]["message"]["content"].strip()
+                parsed = ujson.loads(out)
+                if isinstance(parsed, dict):
+                    results[int(row["custom_id"])] = parsed
+            except (KeyError, IndexError, TypeError, ValueError, AttributeError):
+                continue
+
+    # Errored or missing lines go through the direct path
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        retried = await summarize_articles([articles[i] for i in missing])
+        for i, r in zip(missing, retried):
+            results[i] = r
+    return results
+
+def content_hash(article):
+    key = f"{article.get('title') or ''}|{article.get('url') or ''}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+# In-process memo over llm_cache (content_hash -> response, None if not cached)
+_llm_cache = {}
+
+def prefetch_llm_results(conn, hashes):
+    # One IN (...) query for every uncached hash; entries older than the TTL count as misses
+    misses = list(dict.fromkeys(h for h in hashes if h not in _llm_cache))
+    if not misses:
+        return
+    cutoff = datetime.utcnow() - timedelta(days=LLM_CACHE_TTL_DAYS)
+    sel = select(llm_cache_table.c.content_hash, llm_cache_table.c.response_json).where(
+        llm_cache_table.c.content_hash.in_(misses), llm_cache_table.c.created_at > cutoff)
+    found = {row[0]: row[1] for row in conn.execute(sel)}
+    for h in misses:
+        _llm_cache[h] = ujson.loads(found[h]) if h in found else None
+
+def get_cached_llm_result(conn, h):
+    if h not in _llm_cache:
+        prefetch_llm_results(conn, [h])
+    return _llm_cache[h]
+
+def store_llm_results(conn, results):
+    now = datetime.utcnow()
+    rows = [{"content_hash": h, "response_json": ujson.dumps(r), "created_at": now} for h, r in results.items()]
+    if not rows:
+        return
+    # REPLACE so expired entries are refreshed
+    conn.execute(llm_cache_table.insert().prefix_with("OR REPLACE"), rows)
+    conn.commit()
+    _llm_cache.update(results)
+
+async def summarize_candidates(conn, articles):
+    hashes = [content_hash(a) for a in articles]
+    prefetch_llm_results(conn, hashes)
+    # Only articles with an unseen title + url go to the LLM, each distinct one once
+    todo = {}
+    for a, h in zip(articles, hashes):
+        if h not in todo and get_cached_llm_result(conn, h) is None:
+            todo[h] = a
+
+    if todo:
+        pending = list(todo.values())
+        llm_results = None
+        if USE_BATCH_API:
+            try:
+                llm_results = await summarize_articles_via_batch_api(pending)
+            except Exception as e:
+                print("OpenAI batch error, falling back to direct calls:", e)
+        if llm_results is None:
+            llm_results = await summarize_articles(pending)
+        # Failures are not cached so the next run retries them
+        store_llm_results(conn, {h: r for h, r in zip(todo, llm_results) if r is not None})
+
+    # Fail gracefully per article
+    return [get_cached_llm_result(conn, h) or fallback_llm_result(a) for a, h in zip(articles, hashes)]
 
 def group_by_topic(items):
     grouped = {}
@@ -210,48 +632,55 @@ def send_email_via_sendgrid(subject, html_content):
         raise
 
 def build_and_send(stories):
-    generated_at = datetime.now(tz.gettz(TIMEZONE)).strftime("%Y-%m-%d %H:%M %Z")
+    generated_at = datetime.now(LOCAL_TZ).strftime("%Y-%m-%d %H:%M %Z")
     grouped = group_by_topic(stories)
     html = template.render(stories=grouped, generated_at=generated_at, total_stories=len(stories), timezone=TIMEZONE)
     subj = f"Business & Tech Digest — {generated_at} — {len(stories)} stories"
     send_email_via_sendgrid(subj, html)
 
-def main():
-    # Fetch
-    newsapi_articles = fetch_newsapi()
-    rss_articles = fetch_rss_feeds()
+async def _amain():
+    # Fetch; NewsAPI and the RSS feeds are independent hosts, so run both at once
+    newsapi_articles, rss_articles = await asyncio.gather(fetch_newsapi(), asyncio.to_thread(fetch_rss_feeds))
     all_articles = newsapi_articles + rss_articles
 
-    all_articles = sorted(all_articles, key=lambda x: x.get('published') or "", reverse=True)
-
-    # dedupe & filter by seen
-    candidates = dedupe_and_filter(all_articles)
-
-    # Keep only top MAX_STORIES
-    candidates = candidates[:MAX_STORIES]
-
-    processed = []
-    for a in candidates:
-        info = {
-            "title": a.get('title'),
-            "url": a.get('url'),
-            "source": a.get('source'),
-            "published": normalize_date(a.get('published')),
-        }
-        # Call LLM
-        llm = call_llm_for_article(a)
-        info['summary'] = llm.get('summary') if isinstance(llm, dict) else str(llm)[:400]
-        info['tags'] = llm.get('tags') if isinstance(llm, dict) else ["Other"]
-        info['sentiment'] = llm.get('sentiment') if isinstance(llm, dict) else "Neutral"
-        info['score'] = llm.get('score') if isinstance(llm, dict) else 0.5
-
-        processed.append(info)
-        add_seen(a.get('id'))
-
-    if processed:
-        build_and_send(processed)
-    else:
-        print("No new stories to send at this time.")
+    # One connection for every DB read/write of the run; writes are committed as they happen
+    with engine.connect() as conn:
+        # dedupe & filter by seen (one IN query over the full list)
+        candidates = dedupe_and_filter(conn, all_articles)
+
+        # Keep only the newest MAX_STORIES
+        candidates = heapq.nlargest(MAX_STORIES, candidates, key=published_sort_key)
+
+        llm_results = await summarize_candidates(conn, candidates)
+
+        processed = []
+        for a, llm in zip(candidates, llm_results):
+            info = {
+                "title": a.get('title'),
+                "url": a.get('url'),
+                "source": a.get('source'),
+                "published": normalize_date(a.get('published')),
+            }
+            info['summary'] = llm.get('summary') if isinstance(llm, dict) else str(llm)[:400]
+            info['tags'] = llm.get('tags') if isinstance(llm, dict) else ["Other"]
+            info['sentiment'] = llm.get('sentiment') if isinstance(llm, dict) else "Neutral"
+            info['score'] = llm.get('score') if isinstance(llm, dict) else 0.5
+
+            processed.append(info)
+
+        if processed:
+            build_and_send(processed)
+            # Only mark as seen once the digest actually went out
+            for a in candidates:
+                add_seen(article_key(a))
+            flush_seen(conn)
+        else:
+            print("No new stories to send at this time.")
+
+def main():
+    asyncio.run(_amain())
+    # Close pooled connections so the WAL is checkpointed into the DB file before it is cached
+    engine.dispose()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
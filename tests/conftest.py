@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# news_digest opens its SQLite DB and loads email_template.html at import time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("CACHE_DB", os.path.join(tempfile.mkdtemp(), "test_seen_articles.db"))
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
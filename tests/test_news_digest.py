@@ -0,0 +1,95 @@
+import news_digest as nd
+
+
+def _results(indices):
+    return [{"index": i, "summary": f"s{i}"} for i in indices]
+
+
+def test_map_batch_results_zero_based_any_order():
+    mapped = nd.map_batch_results(_results([2, 0, 3, 1]), 4)
+    assert [r["summary"] for r in mapped] == ["s0", "s1", "s2", "s3"]
+
+
+def test_map_batch_results_string_indices():
+    mapped = nd.map_batch_results(_results(["0", "1", "2"]), 3)
+    assert [r["index"] for r in mapped] == ["0", "1", "2"]
+
+
+def test_map_batch_results_one_based_complete_uses_order():
+    mapped = nd.map_batch_results(_results([1, 2, 3, 4]), 4)
+    assert [r["index"] for r in mapped] == [1, 2, 3, 4]
+
+
+def test_map_batch_results_one_based_missing_item_is_rejected():
+    assert nd.map_batch_results(_results([1, 2, 3]), 4) == [None] * 4
+
+
+def test_map_batch_results_missing_index_and_short_list_is_rejected():
+    assert nd.map_batch_results([{"summary": "a"}], 2) == [None, None]
+
+
+RSS_FEED = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Example RSS</title>
+<item><title>With link</title><link>https://ex.com/a</link><pubDate>Wed, 14 Oct 2026 10:00:00 +0000</pubDate></item>
+<item><title>Guid only</title><guid>https://ex.com/story/1</guid></item>
+<item><title>Opaque guid</title><guid isPermaLink="false">tag-123</guid></item>
+</channel></rss>"""
+
+ATOM_FEED = b"""<?xml version="1.0"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Example Atom</title>
+<entry><title>Entry</title><id>tag:ex.com,2026:1</id>
+<link rel="self" href="https://ex.com/self"/><link href="https://ex.com/entry"/>
+<updated>2026-10-14T10:00:00Z</updated></entry>
+</feed>"""
+
+RDF_FEED = b"""<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns="http://purl.org/rss/1.0/">
+<channel><title>Example RDF</title></channel>
+<item><title>RDF item</title><link>https://ex.com/rdf</link></item>
+</rdf:RDF>"""
+
+
+def test_parse_feed_xml_rss():
+    items = nd.parse_feed_xml(RSS_FEED, "feed-url")
+    assert [a["url"] for a in items] == ["https://ex.com/a", "https://ex.com/story/1", None]
+    assert items[2]["id"] == "tag-123"
+    assert items[0]["source"] == "Example RSS"
+    assert items[0]["published"] == "Wed, 14 Oct 2026 10:00:00 +0000"
+
+
+def test_parse_feed_xml_atom():
+    [entry] = nd.parse_feed_xml(ATOM_FEED, "feed-url")
+    assert entry["url"] == "https://ex.com/entry"
+    assert entry["source"] == "Example Atom"
+    assert entry["published"] == "2026-10-14T10:00:00Z"
+
+
+def test_parse_feed_falls_back_to_feedparser(monkeypatch):
+    class FakeResponse:
+        content = RDF_FEED
+
+        def raise_for_status(self):
+            pass
+
+    monkeypatch.setattr(nd.SESSION, "get", lambda url, timeout: FakeResponse())
+    [item] = nd.parse_feed("feed-url")
+    assert item["url"] == "https://ex.com/rdf"
+    assert item["source"] == "Example RDF"
+
+
+def test_migrate_schema_rebuilds_old_seen_articles(tmp_path):
+    old = nd.create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with old.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE seen_articles (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                             "article_id VARCHAR NOT NULL UNIQUE, seen_at DATETIME NOT NULL)")
+        conn.exec_driver_sql("INSERT INTO seen_articles (article_id, seen_at) "
+                             "VALUES ('a', '2026-10-14 10:00:00'), ('b', '2026-10-14 11:00:00')")
+
+    nd.migrate_schema(old)
+
+    inspector = nd.inspect(old)
+    assert [c["name"] for c in inspector.get_columns("seen_articles")] == ["article_id", "seen_at"]
+    assert [i["name"] for i in inspector.get_indexes("seen_articles")] == ["idx_seen_at"]
+    assert not inspector.has_table("seen_articles_old")
+    with old.connect() as conn:
+        assert nd.fetch_seen(conn, ["a", "b", "c"]) == {"a", "b"}